@@ -9,7 +9,6 @@ from .base_generator import BaseGenerator, GenerationConfig
 from .schemas import TaskPair
 from .image_utils import ImageRenderer
 from .output_writer import OutputWriter
-from .video_utils import VideoGenerator
 
 __all__ = [
     "BaseGenerator",
@@ -19,3 +18,12 @@ __all__ = [
     "OutputWriter",
     "VideoGenerator",
 ]
+
+
+def __getattr__(name):
+    # VideoGenerator is imported on first use so image-only runs skip
+    # the OpenCV/ffmpeg probing in video_utils
+    if name == "VideoGenerator":
+        from .video_utils import VideoGenerator
+        return VideoGenerator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
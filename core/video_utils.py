@@ -1,23 +1,40 @@
 """Video generation utilities - Generic framework code (DO NOT MODIFY)."""
 
+import shutil
+import subprocess
+import tempfile
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Union
 from PIL import Image
 
-# Check if cv2 is available
-import importlib.util
-
-CV2_AVAILABLE = importlib.util.find_spec("cv2") is not None
+from .image_utils import ImageRenderer
 
-if CV2_AVAILABLE:
+# Check if cv2 is available
+try:
     import cv2
     import numpy as np
-else:
+    CV2_AVAILABLE = True
+except ImportError:
     cv2 = None
     np = None
+    CV2_AVAILABLE = False
     print("⚠️  Warning: opencv-python not installed. Video generation disabled.")
     print("   Install with: pip install opencv-python==4.8.1.78")
 
+# ffmpeg on PATH allows opt-in H.264 encoding through a raw-video pipe
+FFMPEG_PATH = shutil.which("ffmpeg")
+
+# Encoder settings for the ffmpeg pipe: CPU (libx264) and GPU (NVENC)
+X264_OPTIONS = {"preset": "veryfast", "tune": "zerolatency"}
+X264_PRESETS = (
+    "ultrafast", "superfast", "veryfast", "faster", "fast",
+    "medium", "slow", "slower", "veryslow", "placebo",
+)
+NVENC_ARGS = [
+    "-c:v", "h264_nvenc", "-preset", "p4", "-tune", "ll",
+    "-b:v", "5M", "-maxrate", "5M", "-bufsize", "10M", "-rc", "cbr",
+]
+
 
 class VideoGenerator:
     """
@@ -26,16 +43,44 @@ class VideoGenerator:
     This is a generic utility class - use it in your custom generator.
     """
     
-    def __init__(self, fps: int = 10, output_format: str = "mp4"):
+    # Whether ffmpeg offers h264_nvenc; probed once per process
+    _nvenc_available: Optional[bool] = None
+    
+    # Set once an ffmpeg encode has succeeded in this process; from then on frame
+    # iterators are streamed straight into ffmpeg without being kept for a retry
+    _ffmpeg_verified: bool = False
+    
+    def __init__(
+        self,
+        fps: int = 10,
+        output_format: str = "mp4",
+        use_ffmpeg: bool = False,
+        threads: Optional[int] = None,
+        encoder_options: Optional[Dict[str, str]] = None
+    ):
         """
         Initialize video generator.
         
         Args:
             fps: Frames per second
             output_format: Video format - "mp4" (recommended) or "avi"
+            use_ffmpeg: Encode mp4 as H.264 through ffmpeg instead of OpenCV's mp4v.
+                        Smaller, more compatible files, but slower to encode.
+            threads: ffmpeg encoder threads (None = ffmpeg default). Use 1 when
+                     encoding from several worker processes at once.
+            encoder_options: libx264 options overriding X264_OPTIONS,
+                             e.g. {"preset": "ultrafast"}
         """
         self.fps = fps
         self.output_format = output_format
+        self.threads = threads
+        
+        options = {**X264_OPTIONS, **(encoder_options or {})}
+        if options["preset"] not in X264_PRESETS:
+            raise ValueError(f"Unknown libx264 preset {options['preset']!r}; expected one of {', '.join(X264_PRESETS)}")
+        self.x264_args = ["-c:v", "libx264"]
+        for key, value in options.items():
+            self.x264_args += [f"-{key}", str(value)]
         
         # Use H.264 for mp4 (better compatibility) or XVID for avi
         if output_format == "mp4":
@@ -45,6 +90,15 @@ class VideoGenerator:
             self.codec = 'XVID'
             self.extension = '.avi'
         
+        # Optionally stream raw frames into ffmpeg (libx264) for mp4
+        self.use_ffmpeg = use_ffmpeg and output_format == "mp4"
+        if self.use_ffmpeg and FFMPEG_PATH is None:
+            print("⚠️  Warning: ffmpeg not found on PATH. Encoding videos with OpenCV instead.")
+            self.use_ffmpeg = False
+        
+        # Offload encoding to the GPU's NVENC block when ffmpeg supports it
+        self.use_nvenc = self.use_ffmpeg and self.has_nvenc()
+        
         if not CV2_AVAILABLE:
             raise ImportError("opencv-python is required for video generation")
     
@@ -53,37 +107,103 @@ class VideoGenerator:
         """Check if video generation is available."""
         return CV2_AVAILABLE
     
+    @classmethod
+    def has_nvenc(cls) -> bool:
+        """Check if ffmpeg lists the h264_nvenc encoder (cached per process)."""
+        if cls._nvenc_available is None:
+            try:
+                result = subprocess.run(
+                    [FFMPEG_PATH, "-hide_banner", "-encoders"],
+                    capture_output=True, text=True, timeout=10
+                )
+                cls._nvenc_available = "h264_nvenc" in result.stdout
+            except (OSError, subprocess.SubprocessError):
+                cls._nvenc_available = False
+        return cls._nvenc_available
+    
     def create_video_from_frames(
         self,
-        frames: List[Image.Image],
+        frames: Union[List[Image.Image], "np.ndarray"],
         output_path: Path,
         size: Optional[Tuple[int, int]] = None
-    ) -> Path:
+    ) -> Optional[Path]:
         """
         Create video from PIL Image frames.
         
         Args:
-            frames: List of PIL Images
+            frames: List of PIL Images, or a uint8 RGB array of shape (T, H, W, 3)
             output_path: Path to save video (extension will be corrected)
             size: Optional (width, height) tuple. If None, uses first frame size
             
         Returns:
-            Path to created video file
+            Path to created video file, or None if encoding failed
         """
-        if not frames:
+        if len(frames) == 0:
             raise ValueError("No frames provided")
         
         # Get video size
         if size is None:
-            size = frames[0].size
-        
-        width, height = size
+            first = frames[0]
+            size = (first.shape[1], first.shape[0]) if isinstance(first, np.ndarray) else first.size
         
         # Ensure correct extension
         output_path = Path(output_path)
         output_path = output_path.with_suffix(self.extension)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
+        if self.use_ffmpeg and self._write_with_ffmpeg(frames, output_path, size):
+            VideoGenerator._ffmpeg_verified = True
+            return output_path
+        
+        return output_path if self._write_with_opencv(frames, output_path, size) else None
+    
+    def create_video_from_frame_iter(
+        self,
+        frames: Iterable[Union[Image.Image, "np.ndarray"]],
+        output_path: Path,
+        size: Tuple[int, int]
+    ) -> Optional[Path]:
+        """
+        Create video from frames produced one at a time.
+        
+        Frames are piped into the encoder as they arrive, so only the current frame
+        needs to be in memory. A frame may reuse the previous frame's buffer.
+        
+        Args:
+            frames: Iterable of PIL Images or (H, W, 3) uint8 RGB arrays
+            output_path: Path to save video (extension will be corrected)
+            size: (width, height) of the video
+            
+        Returns:
+            Path to created video file, or None if encoding failed
+        """
+        output_path = Path(output_path)
+        output_path = output_path.with_suffix(self.extension)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        if self.use_ffmpeg and VideoGenerator._ffmpeg_verified:
+            if self._run_ffmpeg(frames, output_path, size, self._encoder_args()):
+                return output_path
+            # The frames were consumed by the failed attempt, so there is nothing to retry
+            print(f"   Skipping video {output_path.name}.")
+            return None
+        
+        if self.use_ffmpeg:
+            # Encoder not proven yet: keep the frames so a failed attempt can be retried
+            frames = [np.array(frame) for frame in self._iter_rgb_frames(frames, size)]
+            if not frames:
+                raise ValueError("No frames provided")
+            return self.create_video_from_frames(frames, output_path, size)
+        
+        return output_path if self._write_with_opencv(frames, output_path, size) else None
+    
+    def _write_with_opencv(
+        self,
+        frames: Iterable[Union[Image.Image, "np.ndarray"]],
+        output_path: Path,
+        size: Tuple[int, int]
+    ) -> bool:
+        """Encode frames with OpenCV's VideoWriter. Returns False if the file could not be opened."""
         # Initialize video writer
         fourcc = cv2.VideoWriter_fourcc(*self.codec)
         
@@ -91,24 +211,119 @@ class VideoGenerator:
             str(output_path),
             fourcc,
             self.fps,
-            (width, height)
+            size
         )
+        if not writer.isOpened():
+            print(f"⚠️  Warning: OpenCV could not open {output_path} for writing. Skipping video.")
+            return False
         
-        # Write frames
+        # Write frames, converting to OpenCV format (BGR)
+        for frame_rgb in self._iter_rgb_frames(frames, size):
+            writer.write(cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR))
+        
+        writer.release()
+        return True
+    
+    @staticmethod
+    def _iter_rgb_frames(
+        frames: Iterable[Union[Image.Image, "np.ndarray"]],
+        size: Tuple[int, int]
+    ) -> Iterator["np.ndarray"]:
+        """Yield each frame as a (H, W, 3) uint8 RGB array of the given size."""
         for frame in frames:
+            if isinstance(frame, np.ndarray):
+                if (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_LANCZOS4)
+                yield frame
+                continue
+            
             # Ensure RGB and correct size
             if frame.size != size:
                 frame = frame.resize(size, Image.Resampling.LANCZOS)
+            yield np.asarray(ImageRenderer.ensure_rgb(frame))
+    
+    def _encoder_args(self) -> List[str]:
+        """ffmpeg encoder arguments for the encoder currently in use."""
+        return NVENC_ARGS if self.use_nvenc else self.x264_args
+    
+    def _write_with_ffmpeg(
+        self,
+        frames: Union[List[Image.Image], "np.ndarray"],
+        output_path: Path,
+        size: Tuple[int, int]
+    ) -> bool:
+        """
+        Encode frames to H.264 by piping raw RGB into ffmpeg.
+        
+        Uses NVENC when available, falling back to libx264 if the GPU encoder fails.
+        
+        Returns:
+            True on success, False if ffmpeg failed (caller falls back to OpenCV)
+        """
+        if self.use_nvenc:
+            if self._run_ffmpeg(frames, output_path, size, NVENC_ARGS):
+                return True
+            # Encoder is listed but unusable (no GPU or driver) - stop trying it
+            print("   Falling back to libx264 for the rest of this run.")
+            VideoGenerator._nvenc_available = False
+            self.use_nvenc = False
+        
+        if self._run_ffmpeg(frames, output_path, size, self.x264_args):
+            return True
+        print("   Falling back to OpenCV for this video.")
+        return False
+    
+    def _run_ffmpeg(
+        self,
+        frames: Iterable[Union[Image.Image, "np.ndarray"]],
+        output_path: Path,
+        size: Tuple[int, int],
+        encoder_args: List[str]
+    ) -> bool:
+        """Run one ffmpeg encode with the given encoder arguments."""
+        width, height = size
+        cmd = [
+            FFMPEG_PATH, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{width}x{height}", "-framerate", str(self.fps),
+            # Raw video has nothing to probe
+            "-probesize", "32", "-analyzeduration", "0",
+            "-i", "-",
+            # yuv420p needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            *encoder_args,
+            *(["-threads", str(self.threads)] if self.threads else []),
+            "-pix_fmt", "yuv420p",
+            str(output_path),
+        ]
+        
+        # stderr goes to a file so a chatty ffmpeg can never block on a full pipe
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+            try:
+                for frame_rgb in self._iter_rgb_frames(frames, size):
+                    proc.stdin.write(np.ascontiguousarray(frame_rgb).tobytes())
+                proc.stdin.close()
+            except BrokenPipeError:
+                # ffmpeg exited early; its exit code and stderr say why
+                pass
+            except BaseException:
+                # Never leave ffmpeg running, e.g. when the frame iterator raises
+                proc.kill()
+                raise
+            finally:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+                returncode = proc.wait()
             
-            # Convert PIL Image to OpenCV format (BGR)
-            frame_rgb = frame.convert('RGB')
-            frame_array = np.array(frame_rgb)
-            frame_bgr = cv2.cvtColor(frame_array, cv2.COLOR_RGB2BGR)
-            
-            writer.write(frame_bgr)
+            if returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                print(f"⚠️  Warning: ffmpeg ({encoder_args[1]}) failed on {output_path.name}: {message or f'exit code {returncode}'}")
         
-        writer.release()
-        return output_path
+        return returncode == 0
     
     def create_crossfade_video(
         self,
@@ -10,6 +10,7 @@
 Usage:
     python examples/generate.py --num-samples 100
     python examples/generate.py --num-samples 100 --output data/my_task --seed 42
+    python examples/generate.py --num-samples 1000 --workers 8
 """
 
 import argparse
@@ -31,6 +32,7 @@ def main():
 Examples:
     python examples/generate.py --num-samples 10
     python examples/generate.py --num-samples 100 --output data/output --seed 42
+    python examples/generate.py --num-samples 1000 --workers 8
         """
     )
     parser.add_argument(
@@ -56,6 +58,23 @@ Examples:
         action="store_true",
         help="Disable video generation"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for parallel generation (default: 1)"
+    )
+    parser.add_argument(
+        "--ffmpeg",
+        action="store_true",
+        help="Encode videos as H.264 with ffmpeg instead of OpenCV (slower, smaller files)"
+    )
+    parser.add_argument(
+        "--video-preset",
+        type=str,
+        default="veryfast",
+        help="libx264 preset for --ffmpeg encoding, e.g. ultrafast (default: veryfast)"
+    )
     
     args = parser.parse_args()
     
@@ -71,6 +90,9 @@ Examples:
         random_seed=args.seed,
         output_dir=Path(args.output),
         generate_videos=not args.no_videos,
+        num_workers=args.workers,
+        use_ffmpeg=args.ffmpeg,
+        video_preset=args.video_preset,
     )
     
     # Generate tasks
@@ -81,6 +103,11 @@ Examples:
     writer = OutputWriter(Path(args.output))
     writer.write_dataset(tasks)
     
+    # Remove scratch videos now that they have been copied into the output dir
+    for task in tasks:
+        if task.ground_truth_video:
+            Path(task.ground_truth_video).unlink(missing_ok=True)
+    
     print(f"✅ Done! Generated {len(tasks)} tasks in {args.output}/{config.domain}_task/")
 
 
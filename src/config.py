@@ -7,6 +7,8 @@
 ╚══════════════════════════════════════════════════════════════════════════════╝
 """
 
+from typing import Literal
+
 from pydantic import Field
 from core import GenerationConfig
 
@@ -47,6 +49,28 @@ class TaskConfig(GenerationConfig):
         description="Video frame rate"
     )
     
+    use_ffmpeg: bool = Field(
+        default=False,
+        description="Encode H.264 through ffmpeg instead of OpenCV mp4v (smaller files, slower encoding)"
+    )
+    
+    # ══════════════════════════════════════════════════════════════════════════
+    #  PERFORMANCE SETTINGS
+    # ══════════════════════════════════════════════════════════════════════════
+    
+    num_workers: int = Field(
+        default=1,
+        description="Worker processes for rendering tasks (1 = serial)"
+    )
+    
+    video_preset: Literal[
+        "ultrafast", "superfast", "veryfast", "faster", "fast",
+        "medium", "slow", "slower", "veryslow", "placebo",
+    ] = Field(
+        default="veryfast",
+        description="libx264 preset for ffmpeg encoding (ultrafast encodes fastest, larger files)"
+    )
+    
     # ══════════════════════════════════════════════════════════════════════════
     #  TASK-SPECIFIC SETTINGS
     # ══════════════════════════════════════════════════════════════════════════
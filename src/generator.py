@@ -7,18 +7,297 @@
 ╚══════════════════════════════════════════════════════════════════════════════╝
 """
 
+import functools
+import os
 import random
+import shutil
 import tempfile
 import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 
 from core import BaseGenerator, TaskPair, ImageRenderer
-from core.video_utils import VideoGenerator
 from .config import TaskConfig
 from .prompts import get_prompt
 
+# Numba is optional - rotation falls back to a vectorized NumPy kernel
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    njit = None
+    NUMBA_AVAILABLE = False
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  SHAPE VERTEX TABLE
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _regular_polygon(num_vertices: int, start_angle: float = 0.0) -> List[Tuple[float, float]]:
+    """Vertices of a regular polygon inscribed in the unit circle."""
+    vertices = []
+    for i in range(num_vertices):
+        vertex_angle = i * 2 * math.pi / num_vertices + start_angle
+        vertices.append((math.cos(vertex_angle), math.sin(vertex_angle)))
+    return vertices
+
+
+def _star() -> List[Tuple[Any, Any]]:
+    """
+    Vertices of a 5-pointed star, alternating outer and inner points.
+    
+    Inner points are given in units of the inner radius (the shape's thickness).
+    """
+    vertices = []
+    for i in range(10):  # 5 outer + 5 inner points
+        vertex_angle = i * math.pi / 5 - math.pi/2
+        if i % 2 == 0:
+            vertices.append((math.cos(vertex_angle), math.sin(vertex_angle)))
+        else:
+            vertices.append(((0, math.cos(vertex_angle)), (0, math.sin(vertex_angle))))
+    return vertices
+
+
+def _build_shape_table() -> Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, float]]:
+    """
+    Build unit-size (half_size=1) vertex arrays for every supported shape.
+    
+    A coordinate is either a multiple of half_size, or a (base, k) pair meaning
+    base * half_size + k * thickness, with thickness = half_size * the shape's
+    thickness factor. Keeping the two terms apart reproduces the pixel rounding
+    of expressions like (-half_size + thickness).
+    
+    Returns:
+        name -> (xs, ys, thickness_xs, thickness_ys, thickness_factor)
+    """
+    plus_t = 0.4    # Plus sign thickness
+    cross_t = 0.3   # Cross thickness
+    
+    # Thickness factor for shapes with (base, k) coordinates
+    thickness_factors = {
+        "star": 0.4,            # Inner radius
+        "L_shape": 0.4,         # Bar thickness
+        "T_shape": 0.4,         # Bar thickness
+        "parallelogram": 0.3,   # Skew
+    }
+    
+    shapes = {
+        "square": [
+            (-1, -1),       # top-left
+            (1, -1),        # top-right
+            (1, 1),         # bottom-right
+            (-1, 1),        # bottom-left
+        ],
+        "triangle": [
+            (0, -1),        # top
+            (-1, 1),        # bottom-left
+            (1, 1),         # bottom-right
+        ],
+        "diamond": [
+            (0, -1),        # top
+            (1, 0),         # right
+            (0, 1),         # bottom
+            (-1, 0),        # left
+        ],
+        "pentagon": _regular_polygon(5, -math.pi/2),  # Start from top
+        "hexagon": _regular_polygon(6),
+        "rectangle": [      # Wider than tall
+            (-1.4, -0.7),   # top-left
+            (1.4, -0.7),    # top-right
+            (1.4, 0.7),     # bottom-right
+            (-1.4, 0.7),    # bottom-left
+        ],
+        "star": _star(),
+        "heart": [          # Simplified heart approximated with a polygon
+            (0, 1),         # bottom point
+            (-0.7, 0),      # left curve
+            (-0.3, -0.5),   # left top
+            (0, -0.2),      # center top
+            (0.3, -0.5),    # right top
+            (0.7, 0),       # right curve
+        ],
+        "octagon": _regular_polygon(8),
+        "trapezoid": [      # Wider at bottom
+            (-0.5, -1),     # top left
+            (0.5, -1),      # top right
+            (1, 1),         # bottom right
+            (-1, 1),        # bottom left
+        ],
+        "rhombus": [        # Diamond with different proportions
+            (0, -1),        # top
+            (0.7, 0),       # right
+            (0, 1),         # bottom
+            (-0.7, 0),      # left
+        ],
+        "plus": [           # Thicker cross
+            (-plus_t, -1),      # top left
+            (plus_t, -1),       # top right
+            (plus_t, -plus_t),  # inner top right
+            (1, -plus_t),       # right top
+            (1, plus_t),        # right bottom
+            (plus_t, plus_t),   # inner bottom right
+            (plus_t, 1),        # bottom right
+            (-plus_t, 1),       # bottom left
+            (-plus_t, plus_t),  # inner bottom left
+            (-1, plus_t),       # left bottom
+            (-1, -plus_t),      # left top
+            (-plus_t, -plus_t), # inner top left
+        ],
+        "minus": [          # Horizontal bar
+            (-1, -0.25),    # left top
+            (1, -0.25),     # right top
+            (1, 0.25),      # right bottom
+            (-1, 0.25),     # left bottom
+        ],
+        "L_shape": [
+            (-1, -1),                   # outer top left
+            ((-1, 1), -1),              # inner top left
+            ((-1, 1), (1, -1)),         # inner corner
+            (1, (1, -1)),               # inner top right
+            (1, 1),                     # outer bottom right
+            (-1, 1),                    # outer bottom left
+        ],
+        "T_shape": [
+            (-1, -1),                   # top left
+            (1, -1),                    # top right
+            (1, (-1, 1)),               # inner top right
+            ((0, 0.5), (-1, 1)),        # inner stem right
+            ((0, 0.5), 1),              # stem bottom right
+            ((0, -0.5), 1),             # stem bottom left
+            ((0, -0.5), (-1, 1)),       # inner stem left
+            (-1, (-1, 1)),              # inner top left
+        ],
+        "parallelogram": [
+            ((-1, 1), -1),      # top left
+            ((1, 1), -1),       # top right
+            ((1, -1), 1),       # bottom right
+            ((-1, -1), 1),      # bottom left
+        ],
+        "kite": [
+            (0, -1),        # top
+            (0.4, -0.2),    # right upper
+            (0, 0.6),       # bottom
+            (-0.4, -0.2),   # left upper
+        ],
+        "chevron": [        # V shape
+            (-1, -0.5),     # left top
+            (0, 0.5),       # bottom point
+            (1, -0.5),      # right top
+            (0.6, -0.8),    # right inner
+            (0, 0.1),       # inner bottom
+            (-0.6, -0.8),   # left inner
+        ],
+        "arrow": [          # Pointing right
+            (-1, -0.3),     # left top
+            (0.3, -0.3),    # shaft top
+            (0.3, -1),      # arrow top
+            (1, 0),         # arrow tip
+            (0.3, 1),       # arrow bottom
+            (0.3, 0.3),     # shaft bottom
+            (-1, 0.3),      # left bottom
+        ],
+        "cross": [
+            (-cross_t, -1),         # top left
+            (cross_t, -1),          # top right
+            (cross_t, -cross_t),    # inner top right
+            (1, -cross_t),          # right top
+            (1, cross_t),           # right bottom
+            (cross_t, cross_t),     # inner bottom right
+            (cross_t, 1),           # bottom right
+            (-cross_t, 1),          # bottom left
+            (-cross_t, cross_t),    # inner bottom left
+            (-1, cross_t),          # left bottom
+            (-1, -cross_t),         # left top
+            (-cross_t, -cross_t),   # inner top left
+        ],
+    }
+    # Structure-of-arrays: separate contiguous x and y streams per shape
+    table = {}
+    for name, vertices in shapes.items():
+        # (base, k) for every coordinate; plain numbers have no thickness term
+        coords = np.array(
+            [[c if isinstance(c, tuple) else (c, 0) for c in vertex] for vertex in vertices],
+            dtype=np.float64,
+        )
+        xs, ys = coords[:, 0, 0], coords[:, 1, 0]
+        thickness_xs, thickness_ys = coords[:, 0, 1], coords[:, 1, 1]
+        table[name] = (
+            np.ascontiguousarray(xs), np.ascontiguousarray(ys),
+            np.ascontiguousarray(thickness_xs), np.ascontiguousarray(thickness_ys),
+            thickness_factors.get(name, 0.0),
+        )
+    return table
+
+
+# Built once at import; scaled by half_size when a shape is drawn
+_SHAPE_TABLE: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, float]] = _build_shape_table()
+
+# Shapes whose scaled dimensions are truncated to whole pixels before rotation
+_PIXEL_SNAPPED_SHAPES = {"rectangle"}
+
+
+def _scale_shape(shape: str, half_size: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Unrotated vertex (xs, ys) of a shape at the given half size, or None if unknown."""
+    geometry = _SHAPE_TABLE.get(shape)
+    if geometry is None:
+        return None
+    
+    unit_xs, unit_ys, thickness_xs, thickness_ys, thickness_factor = geometry
+    xs, ys = unit_xs * half_size, unit_ys * half_size
+    if thickness_factor:
+        thickness = half_size * thickness_factor
+        xs = xs + thickness_xs * thickness
+        ys = ys + thickness_ys * thickness
+    if shape in _PIXEL_SNAPPED_SHAPES:
+        xs, ys = np.trunc(xs), np.trunc(ys)
+    return xs, ys
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  FONTS
+# ══════════════════════════════════════════════════════════════════════════════
+
+@functools.lru_cache(maxsize=8)
+def _load_question_mark_font(font_size: int) -> Tuple[ImageFont.ImageFont, Tuple[int, int]]:
+    """Resolve the question mark font once per size and measure the glyph."""
+    try:
+        font = ImageFont.truetype("arial.ttf", font_size)
+    except OSError:
+        font = ImageFont.load_default()
+    bbox = ImageDraw.Draw(Image.new('RGB', (1, 1))).textbbox((0, 0), "?", font=font)
+    return font, (bbox[2] - bbox[0], bbox[3] - bbox[1])
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ROTATION KERNEL
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _rotate_vertices_np(xs: np.ndarray, ys: np.ndarray, cos_a: float, sin_a: float, center_x: int, center_y: int) -> np.ndarray:
+    """Rotate vertices about the origin and translate them to the center, as (N, 2) ints."""
+    out = np.empty((xs.shape[0], 2), dtype=np.int32)
+    
+    # Truncate like int()
+    out[:, 0] = xs * cos_a - ys * sin_a + center_x
+    out[:, 1] = xs * sin_a + ys * cos_a + center_y
+    return out
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _rotate_vertices_nb(xs, ys, cos_a, sin_a, center_x, center_y):
+        """Fused rotate + translate + truncate loop; avoids NumPy temporaries for tiny N."""
+        out = np.empty((xs.shape[0], 2), dtype=np.int32)
+        for i in range(xs.shape[0]):
+            out[i, 0] = int(xs[i] * cos_a - ys[i] * sin_a + center_x)
+            out[i, 1] = int(xs[i] * sin_a + ys[i] * cos_a + center_y)
+        return out
+    
+    _rotate_vertices = _rotate_vertices_nb
+else:
+    _rotate_vertices = _rotate_vertices_np
+
 
 class TaskGenerator(BaseGenerator):
     """
@@ -28,14 +307,31 @@ class TaskGenerator(BaseGenerator):
     where shapes undergo rotation transformations.
     """
     
+    # Free space /dev/shm must keep before scratch videos are written there. Videos stay
+    # in the scratch dir until the dataset is written, and other programs share /dev/shm.
+    SHM_MIN_FREE_BYTES = 256 * 1024 * 1024
+    
     def __init__(self, config: TaskConfig):
         super().__init__(config)
         self.renderer = ImageRenderer(image_size=config.image_size)
         
+        # Blank canvas copied for new frames instead of re-filling a fresh image
+        self._blank_template = self.renderer.create_blank_image()
+        
+        # Question mark font and glyph size for centering (shared across generators)
+        self._qmark_font, self._qmark_size = _load_question_mark_font(config.question_mark_size)
+        
         # Initialize video generator if enabled
         self.video_generator = None
-        if config.generate_videos and VideoGenerator.is_available():
-            self.video_generator = VideoGenerator(fps=config.video_fps, output_format="mp4")
+        if config.generate_videos:
+            from core.video_utils import VideoGenerator
+            if VideoGenerator.is_available():
+                self.video_generator = VideoGenerator(
+                    fps=config.video_fps,
+                    output_format="mp4",
+                    use_ffmpeg=config.use_ffmpeg,
+                    encoder_options={"preset": config.video_preset},
+                )
         
         # Shape definitions - expanded set of shapes that show clear rotation effects
         self.base_shapes = [
@@ -54,11 +350,26 @@ class TaskGenerator(BaseGenerator):
             330, 337.5, 345, 352.5
         ]
         
+        # (cos, sin) for every fixed angle, plus 0° for the unrotated shapes
+        self._trig_table = {
+            angle: (math.cos(math.radians(angle)), math.sin(math.radians(angle)))
+            for angle in [0.0] + self.rotation_angles
+        }
+        
         # Single color for all shapes (focus on rotation, not color)
         self.shape_color = (70, 130, 180)  # Blue
         
-        # Track generated combinations to prevent duplicates
-        self.generated_combinations = set()
+        # Every unique (shape_a, shape_c, rotation_angle) combination, in random order.
+        # Tasks walk the pool front to back, so no combination repeats until all are used.
+        self._combo_pool = [
+            (shape_a, shape_c, rotation_angle)
+            for shape_a in self.base_shapes
+            for shape_c in self.base_shapes
+            if shape_a != shape_c
+            for rotation_angle in self.rotation_angles
+        ]
+        random.shuffle(self._combo_pool)
+        self._combo_idx = 0
     
     def generate_task_pair(self, task_id: str) -> TaskPair:
         """Generate one shape rotation task pair."""
@@ -66,17 +377,62 @@ class TaskGenerator(BaseGenerator):
         # Generate task data
         task_data = self._generate_task_data()
         
-        # Render images
-        first_image = self._render_initial_state(task_data)
-        final_image = self._render_final_state(task_data)
+        # Select prompt
+        prompt = get_prompt(task_data.get("transformation_type", "default"))
+        
+        return self._render_task_pair(task_id, task_data, prompt)
+    
+    def generate_dataset(self) -> List[TaskPair]:
+        """Generate complete dataset, in parallel when num_workers > 1."""
+        if self.config.num_workers <= 1:
+            return super().generate_dataset()
+        
+        task_ids = [f"{self.config.domain}_{i:04d}" for i in range(self.config.num_samples)]
+        return self.generate_batch(task_ids, max_workers=self.config.num_workers)
+    
+    def generate_batch(self, task_ids: List[str], max_workers: Optional[int] = None) -> List[TaskPair]:
+        """
+        Generate task pairs in parallel across worker processes.
+        
+        Task data and prompts are drawn here, in the same order as the serial path, so
+        a given seed yields the same dataset for any number of workers. Workers only render.
+        
+        Args:
+            task_ids: Task IDs to generate
+            max_workers: Number of worker processes (default: os.cpu_count())
+            
+        Returns:
+            Task pairs in the same order as task_ids
+        """
+        task_datas, prompts = [], []
+        for _ in task_ids:
+            task_data = self._generate_task_data()
+            task_datas.append(task_data)
+            prompts.append(get_prompt(task_data.get("transformation_type", "default")))
+        
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(self.config,),
+        ) as executor:
+            pairs = []
+            for pair in executor.map(_render_in_worker, task_ids, task_datas, prompts):
+                pairs.append(pair)
+                print(f"  Generated: {pair.task_id}")
+        return pairs
+    
+    def _render_task_pair(self, task_id: str, task_data: Dict[str, Any], prompt: str) -> TaskPair:
+        """Render images and video for already-generated task data and prompt."""
+        
+        # Render images (static elements are drawn once and shared)
+        background = self._render_shared_background(task_data)
+        first_image = self._render_initial_state(task_data, background)
+        final_image = self._render_final_state(task_data, background)
         
         # Generate video (optional)
         video_path = None
         if self.config.generate_videos and self.video_generator:
-            video_path = self._generate_video(first_image, final_image, task_id, task_data)
-        
-        # Select prompt
-        prompt = get_prompt(task_data.get("transformation_type", "default"))
+            video_path = self._generate_video(first_image, final_image, task_id, task_data, background)
         
         return TaskPair(
             task_id=task_id,
@@ -94,56 +450,18 @@ class TaskGenerator(BaseGenerator):
     def _generate_task_data(self) -> Dict[str, Any]:
         """Generate rotation transformation task data with duplicate prevention."""
         
-        # Calculate total possible unique combinations
-        num_shapes = len(self.base_shapes)
-        num_rotation_angles = len(self.rotation_angles)
-        max_unique_combinations = num_shapes * (num_shapes - 1) * num_rotation_angles
-        
-        # If we haven't exhausted all combinations, ensure uniqueness
-        if len(self.generated_combinations) < max_unique_combinations:
-            max_attempts = 1000  # Increase attempts for better coverage
-            for attempt in range(max_attempts):
-                # Select two different shapes for the analogy
-                shape_a, shape_c = random.sample(self.base_shapes, 2)
-                # Select rotation angle
-                rotation_angle = random.choice(self.rotation_angles)
-                
-                # Create a unique identifier for this combination
-                combination_key = (shape_a, shape_c, rotation_angle)
-                
-                # Check if this combination has been used before
-                if combination_key not in self.generated_combinations:
-                    self.generated_combinations.add(combination_key)
-                    return self._generate_rotation_task(shape_a, shape_c, rotation_angle)
-            
-            # If we still can't find a unique combination after many attempts,
-            # generate all remaining combinations systematically
-            return self._generate_systematic_unique_combination()
+        # If we've exhausted unique combinations, reshuffle and allow duplicates but warn
+        if self._combo_idx == len(self._combo_pool):
+            print(f"⚠️  Warning: Generated all {len(self._combo_pool)} unique combinations. Allowing duplicates for remaining tasks.")
+            random.shuffle(self._combo_pool)
+            self._combo_idx = 0
         
-        # If we've exhausted unique combinations, allow duplicates but warn
-        if len(self.generated_combinations) == max_unique_combinations:
-            print(f"⚠️  Warning: Generated all {max_unique_combinations} unique combinations. Allowing duplicates for remaining tasks.")
+        combination_key = self._combo_pool[self._combo_idx]
+        self._combo_idx += 1
         
-        shape_a, shape_c = random.sample(self.base_shapes, 2)
-        rotation_angle = random.choice(self.rotation_angles)
+        shape_a, shape_c, rotation_angle = combination_key
         return self._generate_rotation_task(shape_a, shape_c, rotation_angle)
     
-    def _generate_systematic_unique_combination(self) -> Dict[str, Any]:
-        """Generate a unique combination systematically when random selection fails."""
-        # Generate all possible combinations and find one not yet used
-        for shape_a in self.base_shapes:
-            for shape_c in self.base_shapes:
-                if shape_a == shape_c:
-                    continue
-                for rotation_angle in self.rotation_angles:
-                    combination_key = (shape_a, shape_c, rotation_angle)
-                    if combination_key not in self.generated_combinations:
-                        self.generated_combinations.add(combination_key)
-                        return self._generate_rotation_task(shape_a, shape_c, rotation_angle)
-        
-        # This should never happen if our math is correct
-        raise RuntimeError("Failed to generate unique combination - this should not happen!")
-    
     def _generate_rotation_task(self, shape_a: str, shape_c: str, rotation_angle: float) -> Dict[str, Any]:
         """Generate a rotation transformation task."""
         return {
@@ -160,11 +478,8 @@ class TaskGenerator(BaseGenerator):
     #  IMAGE RENDERING
     # ══════════════════════════════════════════════════════════════════════════
     
-    def _render_initial_state(self, task_data: Dict[str, Any]) -> Image.Image:
-        """Render the initial state with A:B :: C:? layout."""
-        img = self.renderer.create_blank_image()
-        draw = ImageDraw.Draw(img)
-        
+    def _get_layout_positions(self) -> Dict[str, Tuple[int, int]]:
+        """Centers of every cell in the A:B :: C:? layout."""
         width, height = self.config.image_size
         margin = self.config.margin
         shape_size = self.config.shape_size
@@ -173,57 +488,53 @@ class TaskGenerator(BaseGenerator):
         # A    →    B
         # C    →    ?
         
-        positions = {
+        return {
             "A": (margin + shape_size//2, height//4),
             "arrow1": (width//2, height//4),
             "B": (width - margin - shape_size//2, height//4),
             "C": (margin + shape_size//2, 3*height//4),
             "arrow2": (width//2, 3*height//4),
-            "question": (width - margin - shape_size//2, 3*height//4)
+            "answer": (width - margin - shape_size//2, 3*height//4)
         }
+    
+    def _render_shared_background(self, task_data: Dict[str, Any]) -> Image.Image:
+        """Render the elements common to every frame: A, B, C and both arrows."""
+        img = self._blank_template.copy()
+        draw = ImageDraw.Draw(img)
         
-        # Draw shapes and arrows - CRITICAL: Shape B shows the example rotation
-        rotation_angle = task_data["rotation_angle"]  # Store once to ensure consistency
+        positions = self._get_layout_positions()
+        shape_size = self.config.shape_size
         
+        # Draw shapes and arrows - CRITICAL: Shape B shows the example rotation
         self._draw_shape_at_position(draw, task_data["shape_a"], positions["A"], shape_size, 0)  # Original orientation
         self._draw_arrow(draw, positions["arrow1"])
-        self._draw_shape_at_position(draw, task_data["shape_b"], positions["B"], shape_size, rotation_angle)  # Example rotation
+        self._draw_shape_at_position(draw, task_data["shape_b"], positions["B"], shape_size, task_data["rotation_angle"])  # Example rotation
         
         self._draw_shape_at_position(draw, task_data["shape_c"], positions["C"], shape_size, 0)  # Original orientation
         self._draw_arrow(draw, positions["arrow2"])
-        self._draw_question_mark(draw, positions["question"])
         
         return img
     
-    def _render_final_state(self, task_data: Dict[str, Any]) -> Image.Image:
-        """Render the final state with the answer revealed."""
-        img = self.renderer.create_blank_image()
+    def _render_initial_state(self, task_data: Dict[str, Any], background: Optional[Image.Image] = None) -> Image.Image:
+        """Render the initial state with A:B :: C:? layout."""
+        if background is None:
+            background = self._render_shared_background(task_data)
+        img = background.copy()
         draw = ImageDraw.Draw(img)
         
-        width, height = self.config.image_size
-        margin = self.config.margin
-        shape_size = self.config.shape_size
-        
-        # Same layout as initial state
-        positions = {
-            "A": (margin + shape_size//2, height//4),
-            "arrow1": (width//2, height//4),
-            "B": (width - margin - shape_size//2, height//4),
-            "C": (margin + shape_size//2, 3*height//4),
-            "arrow2": (width//2, 3*height//4),
-            "D": (width - margin - shape_size//2, 3*height//4)
-        }
-        
-        # Draw shapes and arrows - CRITICAL: Both B and D must use EXACTLY the same rotation angle
-        rotation_angle = task_data["rotation_angle"]  # Store once to ensure consistency
+        self._draw_question_mark(draw, self._get_layout_positions()["answer"])
         
-        self._draw_shape_at_position(draw, task_data["shape_a"], positions["A"], shape_size, 0)  # Original orientation
-        self._draw_arrow(draw, positions["arrow1"])
-        self._draw_shape_at_position(draw, task_data["shape_b"], positions["B"], shape_size, rotation_angle)  # Rotated by EXACT angle
+        return img
+    
+    def _render_final_state(self, task_data: Dict[str, Any], background: Optional[Image.Image] = None) -> Image.Image:
+        """Render the final state with the answer revealed."""
+        if background is None:
+            background = self._render_shared_background(task_data)
+        img = background.copy()
+        draw = ImageDraw.Draw(img)
         
-        self._draw_shape_at_position(draw, task_data["shape_c"], positions["C"], shape_size, 0)  # Original orientation
-        self._draw_arrow(draw, positions["arrow2"])
-        self._draw_shape_at_position(draw, task_data["shape_d"], positions["D"], shape_size, rotation_angle)  # Rotated by SAME EXACT angle
+        # CRITICAL: D must use EXACTLY the same rotation angle as B
+        self._draw_shape_at_position(draw, task_data["shape_d"], self._get_layout_positions()["answer"], self.config.shape_size, task_data["rotation_angle"])
         
         return img
     
@@ -234,297 +545,31 @@ class TaskGenerator(BaseGenerator):
     
     def _draw_rotated_shape(self, draw: ImageDraw.Draw, shape: str, x: int, y: int, size: int, color: Tuple[int, int, int], rotation_angle: float):
         """Draw a shape with rotation applied."""
-        half_size = size // 2
-        
-        # Convert rotation angle to radians
-        angle_rad = math.radians(rotation_angle)
-        
-        if shape == "square":
-            # Square vertices
-            vertices = [
-                (-half_size, -half_size),  # top-left
-                (half_size, -half_size),   # top-right
-                (half_size, half_size),    # bottom-right
-                (-half_size, half_size)    # bottom-left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "triangle":
-            # Triangle vertices (equilateral, pointing up)
-            vertices = [
-                (0, -half_size),           # top
-                (-half_size, half_size),   # bottom-left
-                (half_size, half_size)     # bottom-right
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "diamond":
-            # Diamond vertices
-            vertices = [
-                (0, -half_size),    # top
-                (half_size, 0),     # right
-                (0, half_size),     # bottom
-                (-half_size, 0)     # left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "pentagon":
-            # Pentagon vertices
-            vertices = []
-            for i in range(5):
-                vertex_angle = i * 2 * math.pi / 5 - math.pi/2  # Start from top
-                px = half_size * math.cos(vertex_angle)
-                py = half_size * math.sin(vertex_angle)
-                vertices.append((px, py))
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "hexagon":
-            # Hexagon vertices
-            vertices = []
-            for i in range(6):
-                vertex_angle = i * 2 * math.pi / 6
-                px = half_size * math.cos(vertex_angle)
-                py = half_size * math.sin(vertex_angle)
-                vertices.append((px, py))
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "rectangle":
-            # Rectangle vertices (wider than tall)
-            width_factor = 1.4
-            rect_width = int(half_size * width_factor)
-            rect_height = int(half_size * 0.7)
-            vertices = [
-                (-rect_width, -rect_height),  # top-left
-                (rect_width, -rect_height),   # top-right
-                (rect_width, rect_height),    # bottom-right
-                (-rect_width, rect_height)    # bottom-left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "star":
-            # 5-pointed star vertices
-            vertices = []
-            outer_radius = half_size
-            inner_radius = half_size * 0.4
-            
-            for i in range(10):  # 5 outer + 5 inner points
-                if i % 2 == 0:  # Outer points
-                    vertex_angle = i * math.pi / 5 - math.pi/2
-                    px = outer_radius * math.cos(vertex_angle)
-                    py = outer_radius * math.sin(vertex_angle)
-                else:  # Inner points
-                    vertex_angle = i * math.pi / 5 - math.pi/2
-                    px = inner_radius * math.cos(vertex_angle)
-                    py = inner_radius * math.sin(vertex_angle)
-                vertices.append((px, py))
-            
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "heart":
-            # Heart shape using curves (approximate with polygon)
-            # This is a simplified heart shape
-            vertices = [
-                (0, half_size),                    # bottom point
-                (-half_size*0.7, 0),              # left curve
-                (-half_size*0.3, -half_size*0.5), # left top
-                (0, -half_size*0.2),              # center top
-                (half_size*0.3, -half_size*0.5),  # right top
-                (half_size*0.7, 0),               # right curve
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "octagon":
-            # Octagon vertices
-            vertices = []
-            for i in range(8):
-                vertex_angle = i * 2 * math.pi / 8
-                px = half_size * math.cos(vertex_angle)
-                py = half_size * math.sin(vertex_angle)
-                vertices.append((px, py))
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "trapezoid":
-            # Trapezoid vertices (wider at bottom)
-            top_width = half_size * 0.5
-            vertices = [
-                (-top_width, -half_size),     # top left
-                (top_width, -half_size),      # top right
-                (half_size, half_size),       # bottom right
-                (-half_size, half_size)       # bottom left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "rhombus":
-            # Rhombus vertices (diamond with different proportions)
-            vertices = [
-                (0, -half_size),              # top
-                (half_size*0.7, 0),           # right
-                (0, half_size),               # bottom
-                (-half_size*0.7, 0)           # left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "plus":
-            # Plus sign (thicker cross)
-            thickness = half_size * 0.4
-            vertices = [
-                (-thickness, -half_size),      # top left
-                (thickness, -half_size),       # top right
-                (thickness, -thickness),       # inner top right
-                (half_size, -thickness),       # right top
-                (half_size, thickness),        # right bottom
-                (thickness, thickness),        # inner bottom right
-                (thickness, half_size),        # bottom right
-                (-thickness, half_size),       # bottom left
-                (-thickness, thickness),       # inner bottom left
-                (-half_size, thickness),       # left bottom
-                (-half_size, -thickness),      # left top
-                (-thickness, -thickness),      # inner top left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "minus":
-            # Minus sign (horizontal bar)
-            thickness = half_size * 0.25
-            vertices = [
-                (-half_size, -thickness),      # left top
-                (half_size, -thickness),       # right top
-                (half_size, thickness),        # right bottom
-                (-half_size, thickness),       # left bottom
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "L_shape":
-            # L shape
-            thickness = half_size * 0.4
-            vertices = [
-                (-half_size, -half_size),      # outer top left
-                (-half_size+thickness, -half_size),  # inner top left
-                (-half_size+thickness, half_size-thickness),  # inner corner
-                (half_size, half_size-thickness),    # inner top right
-                (half_size, half_size),        # outer bottom right
-                (-half_size, half_size),       # outer bottom left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "T_shape":
-            # T shape
-            thickness = half_size * 0.4
-            vertices = [
-                (-half_size, -half_size),      # top left
-                (half_size, -half_size),       # top right
-                (half_size, -half_size+thickness),  # inner top right
-                (thickness/2, -half_size+thickness),  # inner stem right
-                (thickness/2, half_size),      # stem bottom right
-                (-thickness/2, half_size),     # stem bottom left
-                (-thickness/2, -half_size+thickness),  # inner stem left
-                (-half_size, -half_size+thickness),  # inner top left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "parallelogram":
-            # Parallelogram vertices
-            skew = half_size * 0.3
-            vertices = [
-                (-half_size+skew, -half_size),  # top left
-                (half_size+skew, -half_size),   # top right
-                (half_size-skew, half_size),    # bottom right
-                (-half_size-skew, half_size)    # bottom left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "kite":
-            # Kite vertices
-            vertices = [
-                (0, -half_size),               # top
-                (half_size*0.4, -half_size*0.2),  # right upper
-                (0, half_size*0.6),            # bottom
-                (-half_size*0.4, -half_size*0.2)  # left upper
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "chevron":
-            # Chevron (V shape) vertices
-            vertices = [
-                (-half_size, -half_size*0.5),  # left top
-                (0, half_size*0.5),            # bottom point
-                (half_size, -half_size*0.5),   # right top
-                (half_size*0.6, -half_size*0.8),  # right inner
-                (0, half_size*0.1),            # inner bottom
-                (-half_size*0.6, -half_size*0.8)  # left inner
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "arrow":
-            # Arrow pointing right
-            vertices = [
-                (-half_size, -half_size*0.3),     # left top
-                (half_size*0.3, -half_size*0.3),  # shaft top
-                (half_size*0.3, -half_size),      # arrow top
-                (half_size, 0),                   # arrow tip
-                (half_size*0.3, half_size),       # arrow bottom
-                (half_size*0.3, half_size*0.3),   # shaft bottom
-                (-half_size, half_size*0.3),      # left bottom
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-        
-        elif shape == "cross":
-            # Cross shape
-            thickness = half_size * 0.3
-            vertices = [
-                (-thickness, -half_size),      # top left
-                (thickness, -half_size),       # top right
-                (thickness, -thickness),       # inner top right
-                (half_size, -thickness),       # right top
-                (half_size, thickness),        # right bottom
-                (thickness, thickness),        # inner bottom right
-                (thickness, half_size),        # bottom right
-                (-thickness, half_size),       # bottom left
-                (-thickness, thickness),       # inner bottom left
-                (-half_size, thickness),       # left bottom
-                (-half_size, -thickness),      # left top
-                (-thickness, -thickness),      # inner top left
-            ]
-            rotated_vertices = self._rotate_points(vertices, angle_rad, x, y)
-            draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
-    
-    def _rotate_points(self, points: List[Tuple[float, float]], angle: float, center_x: int, center_y: int) -> List[Tuple[int, int]]:
-        """Rotate a list of points around a center point."""
-        rotated = []
-        cos_a = math.cos(angle)
-        sin_a = math.sin(angle)
-        
-        for px, py in points:
-            # Rotate point
-            rotated_x = px * cos_a - py * sin_a
-            rotated_y = px * sin_a + py * cos_a
-            
-            # Translate to center
-            final_x = int(rotated_x + center_x)
-            final_y = int(rotated_y + center_y)
-            
-            rotated.append((final_x, final_y))
+        vertices = _scale_shape(shape, size // 2)
+        if vertices is None:
+            return
+        xs, ys = vertices
+        
+        cos_a, sin_a = self._get_rotation_trig(rotation_angle)
+        
+        rotated_vertices = self._rotate_points(xs, ys, cos_a, sin_a, x, y)
+        draw.polygon(rotated_vertices, fill=color, outline=(0,0,0), width=2)
+    
+    def _get_rotation_trig(self, rotation_angle: float) -> Tuple[float, float]:
+        """Return (cos, sin) of an angle in degrees, using the precomputed table when possible."""
+        trig = self._trig_table.get(rotation_angle)
+        if trig is None:
+            # Intermediate animation angles are not in the table
+            angle_rad = math.radians(rotation_angle)
+            trig = (math.cos(angle_rad), math.sin(angle_rad))
+        return trig
+    
+    def _rotate_points(self, xs: np.ndarray, ys: np.ndarray, cos_a: float, sin_a: float, center_x: int, center_y: int) -> List[Tuple[int, int]]:
+        """Rotate points, given as x and y arrays, around a center point."""
+        rotated = _rotate_vertices(xs, ys, cos_a, sin_a, center_x, center_y)
         
-        return rotated
+        # Hand PIL a list of (x, y) tuples
+        return [tuple(p) for p in rotated.tolist()]
     
     def _draw_arrow(self, draw: ImageDraw.Draw, position: Tuple[int, int]):
         """Draw a right-pointing arrow."""
@@ -545,102 +590,120 @@ class TaskGenerator(BaseGenerator):
     def _draw_question_mark(self, draw: ImageDraw.Draw, position: Tuple[int, int]):
         """Draw a question mark."""
         x, y = position
-        size = self.config.question_mark_size
-        
-        try:
-            font = ImageFont.truetype("arial.ttf", size)
-        except:
-            font = ImageFont.load_default()
-        
-        # Get text bounds for centering
-        bbox = draw.textbbox((0, 0), "?", font=font)
-        w = bbox[2] - bbox[0]
-        h = bbox[3] - bbox[1]
+        w, h = self._qmark_size
         
         text_x = x - w // 2
         text_y = y - h // 2
         
-        draw.text((text_x, text_y), "?", font=font, fill=(100, 100, 100))
+        draw.text((text_x, text_y), "?", font=self._qmark_font, fill=(100, 100, 100))
     
     # ══════════════════════════════════════════════════════════════════════════
     #  VIDEO GENERATION
     # ══════════════════════════════════════════════════════════════════════════
     
-    def _generate_video(self, first_image: Image.Image, final_image: Image.Image, task_id: str, task_data: Dict[str, Any]) -> str:
+    def _generate_video(self, first_image: Image.Image, final_image: Image.Image, task_id: str, task_data: Dict[str, Any], background: Optional[Image.Image] = None) -> str:
         """Generate ground truth video showing the transformation."""
-        temp_dir = Path(tempfile.gettempdir()) / f"{self.config.domain}_videos"
+        # Prefer RAM-backed /dev/shm so encoding never touches disk before the final copy,
+        # but only while it has room to spare
+        shm = Path("/dev/shm")
+        if shm.is_dir() and shutil.disk_usage(shm).free >= self.SHM_MIN_FREE_BYTES:
+            base_dir = shm
+        else:
+            base_dir = Path(tempfile.gettempdir())
+        temp_dir = base_dir / f"{self.config.domain}_videos"
         temp_dir.mkdir(parents=True, exist_ok=True)
         video_path = temp_dir / f"{task_id}_ground_truth.mp4"
         
-        # Create animation frames
-        frames = self._create_transformation_frames(first_image, final_image, task_data)
+        # Stream animation frames into the encoder as they are drawn
+        frames = self._iter_transformation_frames(first_image, final_image, task_data, background=background)
         
-        result = self.video_generator.create_video_from_frames(frames, video_path)
+        result = self.video_generator.create_video_from_frame_iter(frames, video_path, self.config.image_size)
         return str(result) if result else None
     
-    def _create_transformation_frames(self, first_image: Image.Image, final_image: Image.Image, task_data: Dict[str, Any], hold_frames: int = 15, rotation_frames: int = 30) -> List[Image.Image]:
-        """Create animation frames showing the rotation transformation."""
-        frames = []
-        
+    def _iter_transformation_frames(self, first_image: Image.Image, final_image: Image.Image, task_data: Dict[str, Any], hold_frames: int = 15, rotation_frames: int = 30, background: Optional[Image.Image] = None) -> Iterator[np.ndarray]:
+        """Yield animation frames showing the rotation transformation as (H, W, 3) uint8 arrays."""
         # Hold initial state
+        first_frame = np.asarray(first_image)
         for _ in range(hold_frames):
-            frames.append(first_image.copy())
+            yield first_frame
         
         # Create rotation animation showing the shape gradually rotating
-        frames.extend(self._create_rotation_morph_frames(task_data, rotation_frames))
+        yield from self._iter_rotation_morph_frames(task_data, rotation_frames, background)
         
         # Hold final state
+        final_frame = np.asarray(final_image)
         for _ in range(hold_frames):
-            frames.append(final_image.copy())
-        
-        return frames
+            yield final_frame
     
-    def _create_rotation_morph_frames(self, task_data: Dict[str, Any], num_frames: int) -> List[Image.Image]:
-        """Create frames showing the shape gradually rotating."""
-        frames = []
+    def _iter_rotation_morph_frames(self, task_data: Dict[str, Any], num_frames: int, background: Optional[Image.Image] = None) -> Iterator[np.ndarray]:
+        """
+        Yield frames showing the shape gradually rotating as (H, W, 3) uint8 arrays.
         
+        All frames share one buffer holding the static background; only the small
+        tile around the answer cell is rasterized and updated per frame.
+        """
         width, height = self.config.image_size
-        margin = self.config.margin
-        shape_size = self.config.shape_size
         
         # Position of the shape that's being transformed (bottom right - the answer position)
-        answer_x = width - margin - shape_size//2
-        answer_y = 3*height//4
+        answer_x, answer_y = self._get_layout_positions()["answer"]
+        shape_size = self.config.shape_size
         
         shape_c = task_data["shape_c"]
         target_rotation = task_data["rotation_angle"]
         
-        for i in range(num_frames):
-            # Create frame with static elements
-            img = self.renderer.create_blank_image()
-            draw = ImageDraw.Draw(img)
-            
-            # Draw static elements (A, arrow, B, C, arrow)
-            positions = {
-                "A": (margin + shape_size//2, height//4),
-                "arrow1": (width//2, height//4),
-                "B": (width - margin - shape_size//2, height//4),
-                "C": (margin + shape_size//2, 3*height//4),
-                "arrow2": (width//2, 3*height//4),
-            }
-            
-            # Draw ALL static shapes - CRITICAL: Only the answer shape should rotate during animation
-            static_rotation_angle = task_data["rotation_angle"]  # Fixed rotation for static shapes
-            
-            # Static shapes (A, B, C) and arrows - these NEVER change during animation
-            self._draw_shape_at_position(draw, task_data["shape_a"], positions["A"], shape_size, 0)  # Always original
-            self._draw_arrow(draw, positions["arrow1"])
-            self._draw_shape_at_position(draw, task_data["shape_b"], positions["B"], shape_size, static_rotation_angle)  # Always rotated (example)
-            self._draw_shape_at_position(draw, task_data["shape_c"], positions["C"], shape_size, 0)  # Always original
-            self._draw_arrow(draw, positions["arrow2"])
-            
-            # ONLY the answer shape rotates during animation
-            # Interpolate between 0 and target_rotation for ONLY this shape
-            rotation_progress = i / (num_frames - 1) if num_frames > 1 else 1.0
-            current_rotation = target_rotation * rotation_progress
+        # Static shapes (A, B, C) and arrows - these NEVER change during animation
+        if background is None:
+            background = self._render_shared_background(task_data)
+        frame = np.array(background)
+        
+        # Tile that contains the answer shape at any angle, plus room for the outline
+        radius = int(np.hypot(*_scale_shape(shape_c, shape_size // 2)).max()) + 4
+        x0, y0 = max(answer_x - radius, 0), max(answer_y - radius, 0)
+        x1, y1 = min(answer_x + radius + 1, width), min(answer_y + radius + 1, height)
+        
+        # Reuse one frame buffer and one ImageDraw for the whole animation. Drawing stays in
+        # full-image coordinates (PIL's wide outlines are not exactly translation invariant);
+        # only the tile is reset and read back each frame.
+        box = (x0, y0, x1, y1)
+        tile_background = background.crop(box)
+        frame_buf = background.copy()
+        draw = ImageDraw.Draw(frame_buf)
+        
+        # ONLY the answer shape rotates during animation
+        # Interpolate between 0 and target_rotation for ONLY this shape, all frames at once
+        if num_frames > 1:
+            rotation_progress = np.arange(num_frames) / (num_frames - 1)
+        else:
+            rotation_progress = np.ones(num_frames)
+        rotations = (target_rotation * rotation_progress).tolist()
+        
+        for current_rotation in rotations:
+            # Reset the tile to the pre-rendered static elements
+            frame_buf.paste(tile_background, box)
             
             self._draw_rotated_shape(draw, shape_c, answer_x, answer_y, shape_size, self.shape_color, current_rotation)
             
-            frames.append(img)
-        
-        return frames
+            frame[y0:y1, x0:x1] = np.asarray(frame_buf.crop(box))
+            yield frame
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  PARALLEL WORKERS
+# ══════════════════════════════════════════════════════════════════════════════
+
+# Per-process generator, built once by the pool initializer
+_worker_generator = None
+
+
+def _init_worker(config: TaskConfig):
+    """Build this worker's generator (fonts, video writer) once."""
+    global _worker_generator
+    _worker_generator = TaskGenerator(config)
+    
+    # One encoder thread per worker keeps the pool from oversubscribing the CPU
+    if _worker_generator.video_generator is not None:
+        _worker_generator.video_generator.threads = 1
+
+
+def _render_in_worker(task_id: str, task_data: Dict[str, Any], prompt: str) -> TaskPair:
+    """Render one task in a worker process."""
+    return _worker_generator._render_task_pair(task_id, task_data, prompt)
@@ -15,17 +15,17 @@ import random
 # ══════════════════════════════════════════════════════════════════════════════
 
 PROMPTS = {
-    "default": [
+    "default": (
         "Show the rotation transformation being applied to the second shape. The rotation should match the angular change shown in the example.",
         "Animate the rotation transformation where the shape rotates according to the established pattern. The question mark should smoothly transition to show the rotated version of the shape.",
         "Complete the visual analogy by showing what the second shape becomes when the same rotation transformation is applied.",
-    ],
+    ),
     
-    "rotation": [
+    "rotation": (
         "Show the rotation transformation being applied to the second shape. The rotation should match the angular change shown in the example.",
         "Animate the rotation transformation where the shape rotates according to the established pattern.",
         "Complete the analogy by revealing the rotated version of the second shape.",
-    ],
+    ),
 }
 
 
@@ -39,10 +39,9 @@ def get_prompt(task_type: str = "default") -> str:
     Returns:
         Random prompt string from the specified type
     """
-    prompts = PROMPTS.get(task_type, PROMPTS["default"])
-    return random.choice(prompts)
+    return random.choice(PROMPTS.get(task_type, PROMPTS["default"]))
 
 
 def get_all_prompts(task_type: str = "default") -> list[str]:
     """Get all prompts for a given task type."""
-    return PROMPTS.get(task_type, PROMPTS["default"])
+    return list(PROMPTS.get(task_type, PROMPTS["default"]))